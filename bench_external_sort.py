@@ -0,0 +1,77 @@
+# bench_external_sort.py
+# Runtime: Python 3.11
+#
+# Benchmark for the sorted/deduplicated ALL.csv stage (external_sort.py) on
+# synthetic Route 53 rows. No AWS access needed (boto3 must be installed, as
+# the sort key and columns come from lambda_function).
+#
+# Usage:
+#   python bench_external_sort.py --rows 5000000 --memory-mb 128 --dup-rate 0.1
+
+import os
+import time
+import random
+import argparse
+import resource
+import tempfile
+from typing import Iterator, Tuple
+
+from external_sort import external_sort
+from lambda_function import CSV_FIELDS, master_sort_key
+
+TYPES = ["A", "AAAA", "CNAME", "TXT", "MX", "NS", "SOA", "SRV"]
+
+def synthetic_rows(n: int, accounts: int, dup_rate: float, seed: int) -> Iterator[Tuple[str, ...]]:
+    """Random-order rows in CSV_FIELDS order; `dup_rate` of them repeat an earlier row."""
+    rnd = random.Random(seed)
+    zones = [f"zone{z}.example{z % 50}.com." for z in range(2000)]
+    recent = []
+    for i in range(n):
+        if recent and rnd.random() < dup_rate:
+            yield rnd.choice(recent)
+            continue
+        z = rnd.randrange(len(zones))
+        row = (
+            f"{100000000000 + rnd.randrange(accounts):012d}",
+            f"Z{z:012d}",
+            zones[z],
+            str(z % 7 == 0),
+            f"host{rnd.randrange(10**7)}.{zones[z]}",
+            rnd.choice(TYPES),
+            str(rnd.choice([60, 300, 3600, 86400])),
+            f"10.{rnd.randrange(256)}.{rnd.randrange(256)}.{rnd.randrange(256)}",
+        )
+        if len(recent) < 10000:
+            recent.append(row)
+        else:
+            recent[rnd.randrange(10000)] = row
+        yield row
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the external sort used for ALL.csv")
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--accounts", type=int, default=20)
+    ap.add_argument("--dup-rate", type=float, default=0.05)
+    ap.add_argument("--memory-mb", type=int, default=128)
+    ap.add_argument("--tmp-dir", default=tempfile.gettempdir())
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    out_path = os.path.join(args.tmp_dir, "bench-ALL.csv")
+    start = time.perf_counter()
+    count, spills = external_sort(
+        synthetic_rows(args.rows, args.accounts, args.dup_rate, args.seed),
+        out_path, key=master_sort_key, header=CSV_FIELDS,
+        memory_bytes=args.memory_mb * 1024 * 1024, tmp_dir=args.tmp_dir,
+    )
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(out_path) / (1024 * 1024)
+    os.remove(out_path)
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"rows_in={args.rows} rows_out={count} spill_runs={spills} "
+          f"memory_budget_mb={args.memory_mb} peak_rss_mb={peak_mb:.0f} out_mb={size_mb:.0f}")
+    print(f"elapsed={elapsed:.1f}s throughput={args.rows / elapsed:,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
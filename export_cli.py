@@ -0,0 +1,179 @@
+# export_cli.py
+# Runtime: Python 3.11
+#
+# Standalone runner for backfills / ad-hoc audits outside Lambda. Reuses the
+# export logic in lambda_function.py and spreads accounts over a process pool.
+#
+# Config precedence: flags > --config file (JSON, keys = the Lambda env var
+# names, e.g. {"ORG_ROLE_NAME": "OrgRoute53ReadRole", "ALLOWED_ACCOUNT_IDS": "1,2"})
+# > environment. SNS_TOPIC_ARN / REPORT_BUCKET are only needed when used; the SNS
+# notification (a presigned link) is only sent for s3:// output.
+#
+# Examples:
+#   python export_cli.py --accounts 111111111111,222222222222 --output ./out --no-notify
+#   python export_cli.py --config backfill.json --output s3://org-dns-reports/route53/backfill/ --workers 8
+#   python export_cli.py --config backfill.json --plan
+
+import os
+import csv
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
+
+import lambda_function as lf
+
+logger = logging.getLogger("export_cli")
+
+# (name, id, zones, records, local per-account CSV or None on failure)
+AccountResult = Tuple[str, str, int, int, Optional[str]]
+
+# ---------- Config ----------
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Export Route 53 zones/records for many accounts in parallel.")
+    ap.add_argument("--config", help="JSON file of settings keyed by the Lambda env var names")
+    ap.add_argument("--accounts", help="comma-separated account IDs (ALLOWED_ACCOUNT_IDS)")
+    ap.add_argument("--role-name", help="role to assume in each account (ORG_ROLE_NAME)")
+    ap.add_argument("--output", required=True, help="local directory or s3://bucket/prefix/")
+    ap.add_argument("--stamp", help="report folder name (default: today, UTC, YYYY-MM-DD)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="process pool size")
+    ap.add_argument("--sort", action="store_true", help="sorted, deduplicated ALL.csv (SORT_MASTER)")
+    ap.add_argument("--enrich", action="store_true", help="add zone metadata columns (ENRICH_ZONES)")
+    ap.add_argument("--plan", action="store_true", help="print the export plan and exit")
+    ap.add_argument("--sns-topic-arn", help="notification topic (SNS_TOPIC_ARN)")
+    ap.add_argument("--no-notify", action="store_true", help="skip the SNS notification (s3:// output only)")
+    return ap.parse_args(argv)
+
+def build_settings(args: argparse.Namespace) -> Dict:
+    """Merge --config file and flags into a settings dict for lambda_function.configure."""
+    settings: Dict = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            settings.update(json.load(f))
+    flags = {
+        "ALLOWED_ACCOUNT_IDS": args.accounts,
+        "ORG_ROLE_NAME": args.role_name,
+        "SNS_TOPIC_ARN": args.sns_topic_arn,
+        "SORT_MASTER": True if args.sort else None,
+        "ENRICH_ZONES": True if args.enrich else None,
+    }
+    settings.update({k: v for k, v in flags.items() if v is not None})
+    if args.output.startswith("s3://"):
+        bucket, _, prefix = args.output[len("s3://"):].partition("/")
+        settings["REPORT_BUCKET"] = bucket
+        settings["REPORT_PREFIX"] = prefix
+    return settings
+
+# ---------- Workers ----------
+def _init_worker(settings: Dict) -> None:
+    # spawn re-imports lambda_function, so the parent's overrides must be re-applied
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+    lf.configure(settings)
+
+def export_account(acc: Dict, work_dir: str, s3_prefix: Optional[str]) -> AccountResult:
+    """Collect one account, write its CSV under work_dir (and to S3 if s3_prefix is set)."""
+    acc_id = acc["Id"]
+    acc_name = acc.get("Name", acc_id)
+    try:
+        rows, zc, rc = lf.collect_account_rows(acc_id, acc_name)
+        filename = f"route53_{acc_name}_{acc_id}.csv"
+        path = os.path.join(work_dir, filename)
+        with open(path, "wb") as f:
+            f.write(lf.rows_to_csv_bytes(rows))
+        if s3_prefix is not None:
+            lf.s3_put_file(f"{s3_prefix}{filename}", path)
+        return acc_name, acc_id, zc, rc, path
+    except Exception as e:
+        logger.warning("Account %s (%s) failed: %s", acc_name, acc_id, e)
+        return acc_name, acc_id, -1, -1, None
+
+def _export_account_task(task: Tuple[Dict, str, Optional[str]]) -> AccountResult:
+    return export_account(*task)
+
+# ---------- Master ----------
+def _read_account_rows(paths: List[str]) -> Iterator[Dict]:
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+def write_master(paths: List[str], master_path: str) -> int:
+    """Concatenate (or, with SORT_MASTER, external-sort) the per-account CSVs into ALL.csv."""
+    if lf.SORT_MASTER:
+        return lf.write_sorted_master(_read_account_rows(paths), master_path)
+    count = 0
+    with open(master_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=lf.csv_fields())
+        writer.writeheader()
+        for row in _read_account_rows(paths):
+            writer.writerow(row)
+            count += 1
+    return count
+
+# ---------- Main ----------
+def main(argv: Optional[List[str]] = None) -> Dict:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+    args = parse_args(argv)
+    settings = build_settings(args)
+    lf.configure(settings)
+
+    accounts = lf.get_target_accounts()
+    logger.info("Targeting %d account(s) with %d worker(s)", len(accounts), args.workers)
+
+    if args.plan:
+        plan = lf.build_export_plan(accounts)
+        print(json.dumps(plan, indent=2))
+        return plan
+
+    to_s3 = args.output.startswith("s3://")
+    if to_s3:
+        lf.require_config("REPORT_BUCKET")
+    stamp = args.stamp or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    s3_prefix = f"{lf._normalize_prefix(lf.REPORT_PREFIX)}{stamp}/" if to_s3 else None
+    work_dir = tempfile.mkdtemp(prefix="r53export-") if to_s3 else os.path.join(args.output, stamp)
+    os.makedirs(work_dir, exist_ok=True)
+
+    try:
+        tasks = [(acc, work_dir, s3_prefix) for acc in accounts]
+        # spawn: fresh interpreter per worker, no inherited boto3 clients / sockets
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes=max(1, args.workers), initializer=_init_worker, initargs=(settings,)) as pool:
+            results: List[AccountResult] = pool.map(_export_account_task, tasks, chunksize=1)
+
+        summaries = [(name, aid, zc, rc) for name, aid, zc, rc, _ in results]
+        paths = [path for *_, path in results if path]
+        master_path = os.path.join(work_dir, "ALL.csv")
+        master_count = write_master(paths, master_path)
+
+        if to_s3:
+            master_location = f"{s3_prefix}ALL.csv"
+            lf.s3_put_file(master_location, master_path)
+        else:
+            master_location = os.path.abspath(master_path)
+    finally:
+        if to_s3:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.no_notify or not lf.SNS_TOPIC_ARN:
+        logger.info("Skipping SNS notification")
+    elif not to_s3:
+        # A local path means nothing to email recipients; there is no link to send
+        logger.info("Skipping SNS notification for local output")
+    else:
+        link = lf.s3_presign(master_location)
+        lf.publish_sns(f"[Route53] DNS Export {stamp}", lf.build_report_message(stamp, summaries, link))
+
+    result = {
+        "accountsProcessed": len(accounts),
+        "accountsFailed": sum(1 for s in summaries if s[2] < 0),
+        "rowsInMaster": master_count,
+        "master": master_location,
+    }
+    logger.info("Done: %s", json.dumps(result))
+    return result
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# external_sort.py
+# Runtime: Python 3.11
+#
+# Bounded-memory external merge sort for CSV rows, used to emit a sorted,
+# deduplicated ALL.csv from lambda_function.py. Sorted runs are spilled to
+# tmp_dir (Lambda: /tmp, sized by the function's ephemeral storage setting)
+# and k-way merged with heapq.merge. Pure stdlib, no AWS dependencies.
+
+import os
+import csv
+import heapq
+import tempfile
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Row = Tuple[str, ...]
+
+# Max spill files merged at once; more runs than this are merged in passes
+MAX_FANIN = 128
+
+# ---------- Helpers ----------
+def _row_bytes(row: Row) -> int:
+    """Rough in-memory size of a row of str fields (CPython object overhead included)."""
+    return 56 + 8 * len(row) + sum(49 + len(f) for f in row)
+
+def _dedupe(rows: Iterable[Row]) -> Iterator[Row]:
+    """Drop adjacent duplicates (input must already be sorted)."""
+    prev = None
+    for r in rows:
+        if r != prev:
+            yield r
+            prev = r
+
+def _write_run(rows: Iterable[Row], tmp_dir: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="sortrun-", suffix=".csv", dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def _read_run(path: str) -> Iterator[Row]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for r in csv.reader(f):
+            yield tuple(r)
+
+def _merge_runs(paths: List[str], key: Callable[[Row], object]) -> Iterator[Row]:
+    # Full row as tiebreak so identical rows end up adjacent for _dedupe
+    return _dedupe(heapq.merge(*(_read_run(p) for p in paths), key=lambda r: (key(r), r)))
+
+# ---------- Sort ----------
+def external_sort(
+    rows: Iterable[Sequence[str]],
+    out_path: str,
+    key: Callable[[Row], object],
+    header: Optional[Sequence[str]] = None,
+    memory_bytes: int = 128 * 1024 * 1024,
+    tmp_dir: str = "/tmp",
+) -> Tuple[int, int]:
+    """
+    Sort `rows` by `key` (then by the full row), drop exact duplicates and
+    write them as CSV to `out_path`, holding roughly `memory_bytes` of rows
+    in memory at a time. Returns (rows_written, spill_runs).
+    """
+    # list.sort keeps a key per item, so the buffer gets half the budget
+    limit = max(1, memory_bytes // 2)
+    sort_key = lambda r: (key(r), r)
+    runs: List[str] = []
+    buf: List[Row] = []
+    used = 0
+    try:
+        for r in rows:
+            r = tuple(r)
+            buf.append(r)
+            used += _row_bytes(r)
+            if used >= limit:
+                buf.sort(key=sort_key)
+                runs.append(_write_run(_dedupe(buf), tmp_dir))
+                buf, used = [], 0
+        spills = len(runs)
+
+        # Everything fit in memory: no merge needed
+        if not runs:
+            buf.sort(key=sort_key)
+            merged: Iterable[Row] = _dedupe(buf)
+        else:
+            if buf:
+                buf.sort(key=sort_key)
+                runs.append(_write_run(_dedupe(buf), tmp_dir))
+                buf = []
+            # Multi-pass merge keeps open file handles bounded
+            while len(runs) > MAX_FANIN:
+                group = runs[:MAX_FANIN]
+                merged_run = _write_run(_merge_runs(group, key), tmp_dir)
+                # Only drop the inputs once the merged run exists, so `finally` still sees them on failure
+                runs = runs[MAX_FANIN:] + [merged_run]
+                for p in group:
+                    os.remove(p)
+            merged = _merge_runs(runs, key)
+
+        count = 0
+        with open(out_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if header:
+                writer.writerow(header)
+            for r in merged:
+                writer.writerow(r)
+                count += 1
+        return count, spills
+    finally:
+        for p in runs:
+            if os.path.exists(p):
+                os.remove(p)
@@ -0,0 +1,673 @@
+# lambda_function.py
+# Runtime: Python 3.11
+#
+# Required ENV VARS:
+#   ORG_ROLE_NAME       = OrgRoute53ReadRole
+#   REPORT_BUCKET       = org-dns-reports-123456789012
+#   REPORT_PREFIX       = route53/monthly/
+#   SNS_TOPIC_ARN       = arn:aws:sns:<region>:<acct>:route53-monthly-dns-report
+# Optional:
+#   PRESIGN_TTL_SEC     = 604800       # 7 days default
+#   ALLOWED_ACCOUNT_IDS = 111111111111,222222222222  # only process these accounts; skip Organizations API
+#   FORCE_ALLOWED_ONLY  = false        # true: fail fast instead of falling back to Organizations
+#   PLAN_ONLY           = false        # dry-run: only emit the export plan (same as event {"plan": true})
+#   R53_MAX_RPS         = 5            # Route 53 API rate limit per account (requests/second)
+#   R53_CALL_LATENCY_SEC = 0.25        # typical round trip of one Route 53 list call
+#   LAMBDA_BUDGET_SEC   = 840          # usable run time (900 s timeout minus headroom for S3/SNS)
+#   SORT_MASTER         = false        # sort ALL.csv by (reversed RecordName labels, Type, AccountId) + dedupe
+#   SORT_MEMORY_MB      = 128          # in-memory budget for the external sort; the rest spills to disk
+#   SORT_TMP_DIR        = /tmp         # spill dir (needs ~2x ALL.csv of Lambda ephemeral storage)
+#   ENRICH_ZONES        = false        # add VPCAssociations / DNSSECStatus / QueryLogGroupArn columns
+#   ENRICH_CACHE_PATH   =              # local dir for the zone metadata cache (default: <REPORT_PREFIX>cache/ in S3)
+#   ENRICH_CACHE_MAX_AGE_SEC = 604800  # refetch cached zone metadata after this long (7 days default)
+#
+# Plans (PLAN_ONLY / {"plan": true}) are advisory. This exporter only runs the
+# "single" strategy: one invocation paging zones one at a time. A plan of
+# parallel-zones, sharded-zones or fan-out means the export must be split by hand
+# (e.g. export_cli.py, or several invocations with smaller ALLOWED_ACCOUNT_IDS).
+#
+# ENRICH_ZONES needs route53:GetHostedZone, route53:GetDNSSEC and
+# route53:ListQueryLoggingConfigs on OrgRoute53ReadRole.
+#
+# Package with: zip -r function.zip lambda_function.py external_sort.py
+# Outside Lambda (backfills / audits): see export_cli.py
+
+import os
+import io
+import csv
+import time
+import json
+import math
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
+
+import boto3
+import botocore
+
+from external_sort import external_sort
+
+# ---------- Config ----------
+# Required values are checked when used (not at import) so export_cli.py can import this module
+ORG_ROLE_NAME     = os.environ.get("ORG_ROLE_NAME", "")
+REPORT_BUCKET     = os.environ.get("REPORT_BUCKET", "")
+REPORT_PREFIX     = os.environ.get("REPORT_PREFIX", "route53/monthly/")
+SNS_TOPIC_ARN     = os.environ.get("SNS_TOPIC_ARN", "")
+PRESIGN_TTL_SEC   = int(os.environ.get("PRESIGN_TTL_SEC", "604800"))  # 7 days default
+ALLOWED_ACCOUNTS  = [a.strip() for a in os.environ.get("ALLOWED_ACCOUNT_IDS", "").split(",") if a.strip()]
+FORCE_ALLOWED_ONLY = os.environ.get("FORCE_ALLOWED_ONLY", "false").lower() == "true"
+PLAN_ONLY         = os.environ.get("PLAN_ONLY", "false").lower() == "true"
+R53_MAX_RPS       = float(os.environ.get("R53_MAX_RPS", "5"))
+R53_CALL_LATENCY_SEC = float(os.environ.get("R53_CALL_LATENCY_SEC", "0.25"))
+LAMBDA_BUDGET_SEC = int(os.environ.get("LAMBDA_BUDGET_SEC", "840"))
+SORT_MASTER       = os.environ.get("SORT_MASTER", "false").lower() == "true"
+SORT_MEMORY_MB    = int(os.environ.get("SORT_MEMORY_MB", "128"))
+SORT_TMP_DIR      = os.environ.get("SORT_TMP_DIR", "/tmp")
+ENRICH_ZONES      = os.environ.get("ENRICH_ZONES", "false").lower() == "true"
+ENRICH_CACHE_PATH = os.environ.get("ENRICH_CACHE_PATH", "")
+ENRICH_CACHE_MAX_AGE_SEC = int(os.environ.get("ENRICH_CACHE_MAX_AGE_SEC", "604800"))
+
+# Route 53 page sizes (ListResourceRecordSets caps MaxItems at 300)
+ZONE_PAGE_SIZE    = 100
+RRSET_PAGE_SIZE   = 300
+
+# AWS clients (created lazily, once per process; boto3 clients are not fork-safe)
+_CLIENTS: Dict[Tuple[int, str], object] = {}
+
+def _client(service: str):
+    key = (os.getpid(), service)
+    if key not in _CLIENTS:
+        _CLIENTS[key] = boto3.client(service)
+    return _CLIENTS[key]
+
+# Logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+CSV_FIELDS = ["AccountId", "ZoneId", "ZoneName", "PrivateZone", "RecordName", "Type", "TTL", "Values"]
+ENRICH_FIELDS = ["VPCAssociations", "DNSSECStatus", "QueryLogGroupArn"]
+
+def csv_fields() -> List[str]:
+    """Output columns; the zone metadata columns are only added with ENRICH_ZONES."""
+    return CSV_FIELDS + ENRICH_FIELDS if ENRICH_ZONES else CSV_FIELDS
+
+# ---------- Config overrides ----------
+_BOOL_SETTINGS  = {"FORCE_ALLOWED_ONLY", "PLAN_ONLY", "SORT_MASTER", "ENRICH_ZONES"}
+_INT_SETTINGS   = {"PRESIGN_TTL_SEC", "LAMBDA_BUDGET_SEC", "SORT_MEMORY_MB", "ENRICH_CACHE_MAX_AGE_SEC"}
+_FLOAT_SETTINGS = {"R53_MAX_RPS", "R53_CALL_LATENCY_SEC"}
+_STR_SETTINGS   = {"ORG_ROLE_NAME", "REPORT_BUCKET", "REPORT_PREFIX", "SNS_TOPIC_ARN", "SORT_TMP_DIR",
+                   "ENRICH_CACHE_PATH"}
+
+def configure(settings: Dict) -> None:
+    """Override the env-derived config. Keys are the env var names above (used by export_cli.py)."""
+    g = globals()
+    for key, value in settings.items():
+        if key == "ALLOWED_ACCOUNT_IDS":
+            if isinstance(value, str):
+                value = value.split(",")
+            g["ALLOWED_ACCOUNTS"] = [str(a).strip() for a in value if str(a).strip()]
+        elif key in _BOOL_SETTINGS:
+            g[key] = value if isinstance(value, bool) else str(value).lower() == "true"
+        elif key in _INT_SETTINGS:
+            g[key] = int(value)
+        elif key in _FLOAT_SETTINGS:
+            g[key] = float(value)
+        elif key in _STR_SETTINGS:
+            g[key] = str(value)
+        else:
+            raise ValueError(f"Unknown setting: {key}")
+
+def require_config(*names: str) -> None:
+    missing = [n for n in names if not globals()[n]]
+    if missing:
+        raise RuntimeError(f"Missing required config: {', '.join(missing)}")
+
+# ---------- Helpers ----------
+def _normalize_prefix(prefix: str) -> str:
+    # An empty prefix means the bucket root, not "/" (which would make keys start with a slash)
+    return prefix if not prefix or prefix.endswith("/") else prefix + "/"
+
+def _backoff_call(fn, *args, **kwargs):
+    """Exponential backoff wrapper for throttling-prone calls."""
+    delay = 1.0
+    for attempt in range(8):
+        try:
+            return fn(*args, **kwargs)
+        except botocore.exceptions.ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "")
+            if code in ("Throttling", "ThrottlingException", "TooManyRequestsException", "RequestLimitExceeded"):
+                if attempt == 7:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+                continue
+            raise
+
+def assume_r53_client(account_id: str):
+    """Assume the cross-account Route53 read role and return a Route53 client."""
+    require_config("ORG_ROLE_NAME")
+    resp = _client("sts").assume_role(
+        RoleArn=f"arn:aws:iam::{account_id}:role/{ORG_ROLE_NAME}",
+        RoleSessionName=f"r53Export-{int(time.time())}"
+    )
+    c = resp["Credentials"]
+    return boto3.client(
+        "route53",
+        aws_access_key_id=c["AccessKeyId"],
+        aws_secret_access_key=c["SecretAccessKey"],
+        aws_session_token=c["SessionToken"]
+    )
+
+def get_target_accounts() -> List[Dict]:
+    """
+    Returns a list of dicts [{Id:<acctId>, Name:<label>}, ...]
+    If ALLOWED_ACCOUNT_IDS is set, only those accounts are used (Name=Id, duplicates dropped).
+    If not set and FORCE_ALLOWED_ONLY is true, we fail fast (no org discovery).
+    Otherwise, we fall back to Organizations list (ACTIVE accounts).
+    """
+    if ALLOWED_ACCOUNTS:
+        logger.info("Using ALLOWED_ACCOUNT_IDS: %s", ",".join(ALLOWED_ACCOUNTS))
+        return [{"Id": aid, "Name": aid} for aid in dict.fromkeys(ALLOWED_ACCOUNTS)]
+
+    if FORCE_ALLOWED_ONLY:
+        raise RuntimeError("ALLOWED_ACCOUNT_IDS is empty and FORCE_ALLOWED_ONLY=true. "
+                           "Set ALLOWED_ACCOUNT_IDS to a comma-separated list of account IDs.")
+
+    # fallback (only if FORCE_ALLOWED_ONLY is false)
+    ORG = boto3.client("organizations")
+    out = []
+    token = None
+    while True:
+        kwargs = {}
+        if token:
+            kwargs["NextToken"] = token
+        resp = _backoff_call(ORG.list_accounts, **kwargs)
+        out.extend(a for a in resp["Accounts"] if a["Status"] == "ACTIVE")
+        token = resp.get("NextToken")
+        if not token:
+            break
+    return out
+
+def list_all_hosted_zones(r53) -> List[Dict]:
+    zones = []
+    marker = None
+    while True:
+        kwargs = {}
+        if marker:
+            kwargs["Marker"] = marker
+        resp = _backoff_call(r53.list_hosted_zones, **kwargs)
+        zones.extend(resp.get("HostedZones", []))
+        if resp.get("IsTruncated"):
+            marker = resp.get("NextMarker")
+        else:
+            break
+    return zones
+
+def list_all_record_sets(r53, zone_id: str) -> List[Dict]:
+    records = []
+    start_name = None
+    start_type = None
+    while True:
+        kwargs = {"HostedZoneId": zone_id, "MaxItems": "1000"}
+        if start_name:
+            kwargs["StartRecordName"] = start_name
+        if start_type:
+            kwargs["StartRecordType"] = start_type
+        resp = _backoff_call(r53.list_resource_record_sets, **kwargs)
+        rrs = resp.get("ResourceRecordSets", [])
+        records.extend(rrs)
+        if resp.get("IsTruncated"):
+            start_name = resp.get("NextRecordName")
+            start_type = resp.get("NextRecordType")
+        else:
+            break
+    return records
+
+def record_to_row(account_id: str, zone: Dict, record: Dict) -> Dict:
+    values = ""
+    if "ResourceRecords" in record:
+        values = ";".join(rr["Value"] for rr in record["ResourceRecords"])
+    elif "AliasTarget" in record:
+        values = f"ALIAS->{record['AliasTarget'].get('DNSName')}"
+    return {
+        "AccountId": account_id,
+        "ZoneId": zone["Id"].split("/")[-1],
+        "ZoneName": zone["Name"],
+        "PrivateZone": zone.get("Config", {}).get("PrivateZone", False),
+        "RecordName": record.get("Name", ""),
+        "Type": record.get("Type", ""),
+        "TTL": record.get("TTL", ""),
+        "Values": values
+    }
+
+def rows_to_csv_bytes(rows: List[Dict]) -> bytes:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=csv_fields())
+    writer.writeheader()
+    writer.writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+def s3_put(key: str, body: bytes) -> None:
+    _backoff_call(_client("s3").put_object, Bucket=REPORT_BUCKET, Key=key, Body=body)
+
+def s3_put_file(key: str, path: str) -> None:
+    """Upload a local file (multipart for large files) without reading it into memory."""
+    _backoff_call(_client("s3").upload_file, path, REPORT_BUCKET, key)
+
+def s3_presign(key: str, expires: Optional[int] = None) -> str:
+    return _client("s3").generate_presigned_url(
+        ClientMethod="get_object",
+        Params={"Bucket": REPORT_BUCKET, "Key": key},
+        ExpiresIn=expires if expires is not None else PRESIGN_TTL_SEC
+    )
+
+def publish_sns(subject: str, message: str) -> None:
+    _client("sns").publish(TopicArn=SNS_TOPIC_ARN, Subject=subject[:100], Message=message)
+
+def collect_account_rows(account_id: str, account_name: str) -> Tuple[List[Dict], int, int]:
+    """Return (rows, zone_count, record_count) for a single account."""
+    r53 = assume_r53_client(account_id)
+    zones = list_all_hosted_zones(r53)
+    zc = len(zones)
+    rc = 0
+    rows: List[Dict] = []
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # Zone metadata is fetched alongside record pagination (boto3 clients are thread-safe)
+        meta_future = pool.submit(enrich_zones, r53, account_id, zones) if ENRICH_ZONES else None
+        for z in zones:
+            rrs = list_all_record_sets(r53, z["Id"])
+            rc += len(rrs)
+            rows.extend(record_to_row(account_id, z, r) for r in rrs)
+        if meta_future is not None:
+            try:
+                meta = meta_future.result()
+            except Exception as e:
+                logger.warning("Account %s (%s) zone metadata failed: %s", account_name, account_id, e)
+                meta = {}
+            blank = {f: "" for f in ENRICH_FIELDS}
+            for row in rows:
+                row.update(meta.get(row["ZoneId"], blank))
+    logger.info("Account %s (%s): zones=%d records=%d", account_name, account_id, zc, rc)
+    return rows, zc, rc
+
+def _ttl_text(seconds: int) -> str:
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size and seconds % size == 0:
+            n = seconds // size
+            return f"{n} {unit}{'s' if n != 1 else ''}"
+    return f"{seconds} seconds"
+
+def build_report_message(stamp: str, summaries: List[Tuple[str, str, int, int]], master_link: str) -> str:
+    """Plain-text notification body: per-account summary plus the presigned master CSV link."""
+    lines = [
+        f"Route 53 Monthly Export — {stamp}",
+        "",
+        "Summary (Account, Id, Zones, Records):"
+    ]
+    for name, aid, zc, rc in summaries:
+        lines.append(f"- {name}, {aid}, {zc}, {rc}")
+    lines += [
+        "",
+        f"Master CSV link (valid for {_ttl_text(PRESIGN_TTL_SEC)}):",
+        f"<{master_link}>",
+        "",
+        "If the link looks broken, copy EVERYTHING between the angle brackets on the line above."
+    ]
+    return "\n".join(lines)
+
+# ---------- Zone metadata ----------
+def _zone_cache_location(account_id: str) -> Optional[str]:
+    """Per-account cache file (local path or S3 key), so parallel workers never share one."""
+    name = f"zone_metadata_{account_id}.json"
+    if ENRICH_CACHE_PATH:
+        return os.path.join(ENRICH_CACHE_PATH, name)
+    if REPORT_BUCKET:
+        return f"{_normalize_prefix(REPORT_PREFIX)}cache/{name}"
+    return None
+
+def load_zone_cache(account_id: str) -> Dict:
+    """Cached zone metadata for an account; a missing or corrupt cache counts as empty."""
+    loc = _zone_cache_location(account_id)
+    cache = None
+    try:
+        if ENRICH_CACHE_PATH:
+            with open(loc, encoding="utf-8") as f:
+                cache = json.load(f)
+        elif loc:
+            body = _backoff_call(_client("s3").get_object, Bucket=REPORT_BUCKET, Key=loc)["Body"].read()
+            cache = json.loads(body)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Zone metadata cache %s unreadable: %s", loc, e)
+    except ValueError as e:
+        # Truncated / corrupt JSON: start over, the next save rewrites it
+        logger.warning("Zone metadata cache %s is corrupt, ignoring it: %s", loc, e)
+    except botocore.exceptions.ClientError as e:
+        if e.response.get("Error", {}).get("Code", "") not in ("NoSuchKey", "404"):
+            logger.warning("Zone metadata cache %s unreadable: %s", loc, e)
+    return cache if isinstance(cache, dict) else {}
+
+def save_zone_cache(account_id: str, cache: Dict) -> None:
+    """Best effort: a failed write only costs refetches on the next run."""
+    loc = _zone_cache_location(account_id)
+    body = json.dumps(cache, sort_keys=True)
+    try:
+        if ENRICH_CACHE_PATH:
+            os.makedirs(ENRICH_CACHE_PATH, exist_ok=True)
+            with open(loc, "w", encoding="utf-8") as f:
+                f.write(body)
+        elif loc:
+            s3_put(loc, body.encode("utf-8"))
+    except Exception as e:
+        logger.warning("Zone metadata cache %s not saved: %s", loc, e)
+
+def _zone_fingerprint(zone: Dict) -> str:
+    """
+    Change state of a zone as far as ListHostedZones exposes it. Route 53 has no
+    zone version, so VPC/DNSSEC changes that leave this untouched are picked up
+    by ENRICH_CACHE_MAX_AGE_SEC instead.
+    """
+    config = zone.get("Config", {})
+    return "|".join(str(v) for v in (
+        zone.get("Name", ""), zone.get("ResourceRecordSetCount", ""),
+        config.get("PrivateZone", False), config.get("Comment", ""),
+        zone.get("LinkedService", {}).get("ServicePrincipal", ""),
+    ))
+
+def list_query_logging_configs(r53) -> Dict[str, str]:
+    """All query logging configs of the account in one paginated call: {zone_id: log_group_arn}."""
+    out: Dict[str, str] = {}
+    token = None
+    while True:
+        kwargs = {}
+        if token:
+            kwargs["NextToken"] = token
+        resp = _backoff_call(r53.list_query_logging_configs, **kwargs)
+        for c in resp.get("QueryLoggingConfigs", []):
+            out[c["HostedZoneId"].split("/")[-1]] = c.get("CloudWatchLogsLogGroupArn", "")
+        token = resp.get("NextToken")
+        if not token:
+            break
+    return out
+
+def _fetch_zone_metadata(r53, zone: Dict) -> Optional[Dict]:
+    """VPC associations (private zones) or DNSSEC status (public zones); None on API error."""
+    try:
+        if zone.get("Config", {}).get("PrivateZone", False):
+            resp = _backoff_call(r53.get_hosted_zone, Id=zone["Id"])
+            vpcs = ";".join(f"{v.get('VPCRegion', '')}:{v.get('VPCId', '')}" for v in resp.get("VPCs", []))
+            return {"VPCAssociations": vpcs, "DNSSECStatus": ""}
+        resp = _backoff_call(r53.get_dnssec, HostedZoneId=zone["Id"])
+        return {"VPCAssociations": "", "DNSSECStatus": resp.get("Status", {}).get("ServeSignature", "")}
+    except botocore.exceptions.ClientError as e:
+        logger.warning("Zone %s metadata failed: %s", zone["Id"], e)
+        return None
+
+def enrich_zones(r53, account_id: str, zones: List[Dict]) -> Dict[str, Dict]:
+    """
+    Return {zone_id: {VPCAssociations, DNSSECStatus, QueryLogGroupArn}} for an account.
+    Query logging comes from one account-wide list call; the per-zone GetHostedZone /
+    GetDNSSEC results are cached across runs and only refetched when the zone changes.
+    """
+    cache = load_zone_cache(account_id)
+    try:
+        log_groups = list_query_logging_configs(r53)
+    except Exception as e:
+        # e.g. older roles without route53:ListQueryLoggingConfigs; VPC/DNSSEC still go ahead
+        logger.warning("Account %s query logging configs failed: %s", account_id, e)
+        log_groups = {}
+    now = int(time.time())
+    out: Dict[str, Dict] = {}
+    live: Dict[str, Dict] = {}
+    fetched = 0
+    for z in zones:
+        zid = z["Id"].split("/")[-1]
+        fp = _zone_fingerprint(z)
+        entry = cache.get(zid)
+        if not isinstance(entry, dict) or entry.get("Fingerprint") != fp or now - entry.get("FetchedAt", 0) > ENRICH_CACHE_MAX_AGE_SEC:
+            meta = _fetch_zone_metadata(r53, z)
+            fetched += 1
+            entry = {"Fingerprint": fp, "FetchedAt": now, **meta} if meta is not None else None
+        if entry is not None:
+            live[zid] = entry
+        out[zid] = {
+            "VPCAssociations": entry.get("VPCAssociations", "") if entry else "",
+            "DNSSECStatus": entry.get("DNSSECStatus", "") if entry else "",
+            "QueryLogGroupArn": log_groups.get(zid, ""),
+        }
+    # Deleted zones drop out of the cache
+    if fetched or live.keys() != cache.keys():
+        save_zone_cache(account_id, live)
+    logger.info("Account %s: zone metadata fetched=%d cached=%d", account_id, fetched, len(zones) - fetched)
+    return out
+
+# ---------- Sorted master ----------
+_NAME_IDX = CSV_FIELDS.index("RecordName")
+_TYPE_IDX = CSV_FIELDS.index("Type")
+_ACCOUNT_IDX = CSV_FIELDS.index("AccountId")
+
+def master_sort_key(row: Tuple[str, ...]) -> Tuple:
+    """(reversed labels of RecordName, Type, AccountId) so a domain's names sort together."""
+    labels = tuple(reversed(row[_NAME_IDX].rstrip(".").lower().split(".")))
+    return (labels, row[_TYPE_IDX], row[_ACCOUNT_IDX])
+
+def write_sorted_master(rows: Iterator[Dict], path: str) -> int:
+    """Write ALL.csv to `path` sorted and deduplicated, within SORT_MEMORY_MB. Returns row count."""
+    fields = csv_fields()
+    as_tuples = (tuple(str(r.get(f, "")) for f in fields) for r in rows)
+    count, spills = external_sort(
+        as_tuples, path, key=master_sort_key, header=fields,
+        memory_bytes=SORT_MEMORY_MB * 1024 * 1024, tmp_dir=SORT_TMP_DIR,
+    )
+    logger.info("Sorted master: rows=%d spill_runs=%d", count, spills)
+    return count
+
+# ---------- Planner ----------
+def _call_sec() -> float:
+    """Wall time of one sequential Route 53 call at the configured latency and rate limit."""
+    return max(R53_CALL_LATENCY_SEC, 1.0 / R53_MAX_RPS)
+
+def estimate_zone_pages(zone: Dict) -> int:
+    """ListResourceRecordSets pages needed for a zone, from its ResourceRecordSetCount."""
+    count = int(zone.get("ResourceRecordSetCount", 0) or 0)
+    return max(1, math.ceil(count / RRSET_PAGE_SIZE))
+
+def plan_account(account_id: str, account_name: str) -> Dict:
+    """Estimate API calls and wall time for one account without listing any records."""
+    r53 = assume_r53_client(account_id)
+    zones = list_all_hosted_zones(r53)
+    zone_pages = [
+        {"ZoneId": z["Id"].split("/")[-1], "Pages": estimate_zone_pages(z)}
+        for z in zones
+    ]
+    list_calls = max(1, math.ceil(len(zones) / ZONE_PAGE_SIZE))
+    record_calls = sum(z["Pages"] for z in zone_pages)
+    max_pages = max((z["Pages"] for z in zone_pages), default=0)
+    # Worst case (all cache misses): ListQueryLoggingConfigs pages + one GetHostedZone/GetDNSSEC per zone,
+    # on one thread next to record pagination and under the same per-account rate limit
+    enrich_calls = max(1, math.ceil(len(zones) / ZONE_PAGE_SIZE)) + len(zones) if ENRICH_ZONES else 0
+    calls = list_calls + record_calls + enrich_calls
+    return {
+        "Id": account_id,
+        "Name": account_name,
+        "Zones": len(zones),
+        "Records": sum(int(z.get("ResourceRecordSetCount", 0) or 0) for z in zones),
+        "ApiCalls": calls,
+        "EnrichCalls": enrich_calls,
+        "SequentialSec": round(calls * _call_sec(), 1),
+        # zones paginated concurrently: bounded by the per-account rate limit or the longest zone
+        "ParallelSec": round(list_calls * _call_sec()
+                             + max((record_calls + enrich_calls) / R53_MAX_RPS,
+                                   max_pages * R53_CALL_LATENCY_SEC,
+                                   enrich_calls * R53_CALL_LATENCY_SEC), 1),
+        "ZonePages": zone_pages,
+    }
+
+def _shard_zones(plans: List[Dict], capacity: int) -> List[Dict]:
+    """First-fit-decreasing pack of each account's zones into shards of at most `capacity` pages."""
+    shards: List[Dict] = []
+    for p in plans:
+        acc_shards: List[Dict] = []
+        for z in sorted(p["ZonePages"], key=lambda z: z["Pages"], reverse=True):
+            target = next((s for s in acc_shards if s["Pages"] + z["Pages"] <= capacity), None)
+            if target is None:
+                target = {"AccountId": p["Id"], "Pages": 0, "ZoneIds": []}
+                acc_shards.append(target)
+            target["Pages"] += z["Pages"]
+            target["ZoneIds"].append(z["ZoneId"])
+        shards.extend(acc_shards)
+    return shards
+
+def build_export_plan(accounts: List[Dict]) -> Dict:
+    """
+    Predict API calls and runtime for an export of `accounts` and pick a strategy
+    (advisory: lambda_handler itself only runs "single"):
+      single          - sequential run fits in one invocation
+      parallel-zones  - one invocation, zones (and accounts) paginated concurrently
+      sharded-zones   - zones packed into several invocations, each within budget
+      fan-out         - a single zone exceeds the budget; chain invocations per zone
+                        handing off NextRecordName/NextRecordType
+      incomplete      - some accounts could not be planned (see "failed"); the estimate
+                        only covers the rest, so it says nothing about fitting
+    """
+    plans: List[Dict] = []
+    failed: List[Dict] = []
+    for acc in accounts:
+        acc_id = acc["Id"]
+        acc_name = acc.get("Name", acc_id)
+        try:
+            plans.append(plan_account(acc_id, acc_name))
+        except Exception as e:
+            logger.warning("Account %s (%s) planning failed: %s", acc_name, acc_id, e)
+            failed.append({"Id": acc_id, "Name": acc_name, "Error": str(e)})
+
+    sequential_sec = sum(p["SequentialSec"] for p in plans)
+    parallel_sec = max((p["ParallelSec"] for p in plans), default=0.0)
+    # pages one invocation can fetch sequentially (shards of an account share its rate limit)
+    capacity = max(1, int(LAMBDA_BUDGET_SEC / _call_sec()))
+    largest_zone = max((z["Pages"] for p in plans for z in p["ZonePages"]), default=0)
+
+    shards: List[Dict] = []
+    if failed:
+        strategy = "incomplete"
+    elif sequential_sec <= LAMBDA_BUDGET_SEC:
+        strategy = "single"
+    elif parallel_sec <= LAMBDA_BUDGET_SEC:
+        strategy = "parallel-zones"
+    elif largest_zone <= capacity:
+        strategy = "sharded-zones"
+        shards = _shard_zones(plans, capacity)
+    else:
+        strategy = "fan-out"
+        # Zones that fit are packed as for sharded-zones; only oversize zones get a chain
+        fitting = [{**p, "ZonePages": [z for z in p["ZonePages"] if z["Pages"] <= capacity]} for p in plans]
+        shards = _shard_zones(fitting, capacity) + [
+            {"AccountId": p["Id"], "ZoneIds": [z["ZoneId"]], "Pages": z["Pages"],
+             "Invocations": math.ceil(z["Pages"] / capacity)}
+            for p in plans for z in p["ZonePages"] if z["Pages"] > capacity
+        ]
+
+    return {
+        "strategy": strategy,
+        "limits": {
+            "maxRps": R53_MAX_RPS,
+            "callLatencySec": R53_CALL_LATENCY_SEC,
+            "budgetSec": LAMBDA_BUDGET_SEC,
+            "pagesPerInvocation": capacity,
+        },
+        "totals": {
+            "accounts": len(plans),
+            "zones": sum(p["Zones"] for p in plans),
+            "records": sum(p["Records"] for p in plans),
+            "apiCalls": sum(p["ApiCalls"] for p in plans),
+            "sequentialSec": round(sequential_sec, 1),
+            "parallelSec": round(parallel_sec, 1),
+            "invocations": sum(s.get("Invocations", 1) for s in shards) or 1,
+        },
+        "accounts": [{k: v for k, v in p.items() if k != "ZonePages"} for p in plans],
+        "failed": failed,
+        "shards": shards,
+    }
+
+# ---------- Handler ----------
+def lambda_handler(event, context):
+    # Planning only lists zones; S3/SNS settings are checked once we actually export
+    require_config("ORG_ROLE_NAME")
+    stamp = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    prefix = _normalize_prefix(REPORT_PREFIX)
+
+    # 1) Determine target accounts
+    accounts = get_target_accounts()
+    logger.info("Targeting %d account(s): %s", len(accounts), ",".join(a["Id"] for a in accounts))
+
+    # Dry-run: predict API calls / wall time and stop before exporting anything
+    if PLAN_ONLY or (event or {}).get("plan"):
+        plan = build_export_plan(accounts)
+        logger.info("Plan: %s", json.dumps(plan))
+        if plan["strategy"] == "incomplete":
+            logger.warning("Plan is incomplete: %d account(s) could not be planned",
+                           len(plan["failed"]))
+        elif plan["strategy"] != "single":
+            logger.warning("Export will not fit this Lambda: it only runs the single strategy "
+                           "(sequential, est. %.0fs > %ds budget); plan suggests %s, which must be "
+                           "split by hand", plan["totals"]["sequentialSec"], LAMBDA_BUDGET_SEC,
+                           plan["strategy"])
+        return plan
+
+    require_config("REPORT_BUCKET", "SNS_TOPIC_ARN")
+
+    summaries: List[Tuple[str, str, int, int]] = []
+
+    # 2) Per-account export (rows streamed so the sorted master never holds them all)
+    def export_accounts() -> Iterator[Dict]:
+        for acc in accounts:
+            acc_id = acc["Id"]
+            acc_name = acc.get("Name", acc_id)
+            try:
+                rows, zc, rc = collect_account_rows(acc_id, acc_name)
+
+                # Write per-account CSV to S3
+                acc_key = f"{prefix}{stamp}/route53_{acc_name}_{acc_id}.csv"
+                s3_put(acc_key, rows_to_csv_bytes(rows))
+
+                summaries.append((acc_name, acc_id, zc, rc))
+            except Exception as e:
+                logger.warning("Account %s (%s) failed: %s", acc_name, acc_id, e)
+                summaries.append((acc_name, acc_id, -1, -1))
+                continue
+            # Aggregate for master CSV
+            yield from rows
+
+    # 3) Master CSV with short key + pre-signed URL
+    date_prefix = f"{prefix}{stamp}/"
+    master_key  = f"{date_prefix}ALL.csv"
+    if not master_key.strip():
+        raise RuntimeError("master_key resolved empty; check REPORT_PREFIX and stamp")
+    if SORT_MASTER:
+        local_path = os.path.join(SORT_TMP_DIR, f"ALL-{stamp}.csv")
+        try:
+            master_count = write_sorted_master(export_accounts(), local_path)
+            s3_put_file(master_key, local_path)
+        finally:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+    else:
+        master_rows = list(export_accounts())
+        master_count = len(master_rows)
+        s3_put(master_key, rows_to_csv_bytes(master_rows))
+    master_link = s3_presign(master_key)
+
+    # 4) Minimal SNS message with angle-bracketed link (to reduce wrapping issues)
+    subject = f"[Route53] Monthly DNS Export {stamp}"
+    publish_sns(subject, build_report_message(stamp, summaries, master_link))
+
+    result = {
+        "accountsProcessed": len(accounts),
+        "rowsInMaster": master_count,
+        "masterKey": master_key,
+        "presignedUrlTTLSeconds": PRESIGN_TTL_SEC
+    }
+    logger.info("Done: %s", json.dumps(result))
+    return result
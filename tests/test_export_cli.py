@@ -0,0 +1,147 @@
+import os
+import csv
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import export_cli
+import lambda_function as lf
+
+SETTING_NAMES = (lf._BOOL_SETTINGS | lf._INT_SETTINGS | lf._FLOAT_SETTINGS | lf._STR_SETTINGS
+                 | {"ALLOWED_ACCOUNTS"})
+
+
+def _row(account, name):
+    return {"AccountId": account, "ZoneId": "Z1", "ZoneName": "example.com.", "PrivateZone": False,
+            "RecordName": name, "Type": "A", "TTL": 300, "Values": "10.0.0.1"}
+
+
+class _InlinePool:
+    """Stands in for the spawn pool so main() runs its workers in-process."""
+
+    def __init__(self, processes, initializer, initargs):
+        initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, tasks, chunksize=1):
+        return [fn(t) for t in tasks]
+
+
+class CliTestCase(unittest.TestCase):
+    def setUp(self):
+        # main() / configure() rewrite lambda_function's module config; put it back afterwards
+        saved = {name: getattr(lf, name) for name in SETTING_NAMES}
+        self.addCleanup(lambda: [setattr(lf, k, v) for k, v in saved.items()])
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+
+class BuildSettingsTest(CliTestCase):
+    def _configure(self, argv):
+        settings = export_cli.build_settings(export_cli.parse_args(argv))
+        lf.configure(settings)
+        return settings
+
+    def test_flags_override_config_file_override_environment(self):
+        config = os.path.join(self.tmp, "backfill.json")
+        with open(config, "w", encoding="utf-8") as f:
+            json.dump({"ORG_ROLE_NAME": "FileRole", "SORT_MEMORY_MB": 64, "ALLOWED_ACCOUNT_IDS": "333"}, f)
+        # "environment" = the values lambda_function read at import
+        with mock.patch.multiple(lf, ORG_ROLE_NAME="EnvRole", SORT_MEMORY_MB=128, SNS_TOPIC_ARN="arn:env"):
+            self._configure(["--config", config, "--role-name", "FlagRole", "--output", self.tmp])
+            self.assertEqual(lf.ORG_ROLE_NAME, "FlagRole")
+            self.assertEqual(lf.SORT_MEMORY_MB, 64)
+            self.assertEqual(lf.ALLOWED_ACCOUNTS, ["333"])
+            self.assertEqual(lf.SNS_TOPIC_ARN, "arn:env")
+
+    def test_s3_output_sets_bucket_and_prefix(self):
+        settings = self._configure(["--output", "s3://reports"])
+        self.assertEqual((settings["REPORT_BUCKET"], settings["REPORT_PREFIX"]), ("reports", ""))
+        self.assertEqual(lf._normalize_prefix(lf.REPORT_PREFIX), "")
+
+        settings = self._configure(["--output", "s3://reports/route53/backfill/"])
+        self.assertEqual((settings["REPORT_BUCKET"], settings["REPORT_PREFIX"]), ("reports", "route53/backfill/"))
+
+    def test_local_output_leaves_bucket_alone(self):
+        settings = self._configure(["--output", self.tmp])
+        self.assertNotIn("REPORT_BUCKET", settings)
+
+
+class WriteMasterTest(CliTestCase):
+    def _account_csv(self, name, rows):
+        path = os.path.join(self.tmp, name)
+        with open(path, "wb") as f:
+            f.write(lf.rows_to_csv_bytes(rows))
+        return path
+
+    def _read(self, path):
+        with open(path, newline="", encoding="utf-8") as f:
+            return [(r["AccountId"], r["RecordName"]) for r in csv.DictReader(f)]
+
+    def setUp(self):
+        super().setUp()
+        lf.configure({"ENRICH_ZONES": False, "SORT_TMP_DIR": self.tmp})
+        self.paths = [
+            self._account_csv("a.csv", [_row("111", "b.example.com."), _row("111", "a.example.com.")]),
+            self._account_csv("b.csv", [_row("111", "b.example.com."), _row("222", "example.org.")]),
+        ]
+        self.out = os.path.join(self.tmp, "ALL.csv")
+
+    def test_plain_concatenation_keeps_order_and_duplicates(self):
+        lf.configure({"SORT_MASTER": False})
+        self.assertEqual(export_cli.write_master(self.paths, self.out), 4)
+        self.assertEqual(self._read(self.out), [("111", "b.example.com."), ("111", "a.example.com."),
+                                                ("111", "b.example.com."), ("222", "example.org.")])
+
+    def test_sort_master_sorts_and_dedupes(self):
+        lf.configure({"SORT_MASTER": True})
+        self.assertEqual(export_cli.write_master(self.paths, self.out), 3)
+        self.assertEqual(self._read(self.out), [("111", "a.example.com."), ("111", "b.example.com."),
+                                                ("222", "example.org.")])
+
+
+class MainNotificationTest(CliTestCase):
+    def _main(self, *argv, topic="arn:topic"):
+        lf.configure({"SNS_TOPIC_ARN": topic, "SORT_MASTER": False, "ENRICH_ZONES": False})
+        ctx = mock.Mock(Pool=_InlinePool)
+        with mock.patch.object(export_cli.multiprocessing, "get_context", return_value=ctx), \
+                mock.patch.object(lf, "collect_account_rows", return_value=([_row("111", "a.example.com.")], 1, 1)), \
+                mock.patch.object(lf, "s3_put_file") as put_file, \
+                mock.patch.object(lf, "s3_presign", return_value="https://link"), \
+                mock.patch.object(lf, "publish_sns") as publish:
+            result = export_cli.main(["--accounts", "111", "--role-name", "Role", "--stamp", "d",
+                                      "--workers", "1", *argv])
+        return result, publish, put_file
+
+    def test_s3_output_notifies(self):
+        result, publish, put_file = self._main("--output", "s3://reports/r53/")
+        self.assertEqual(result["master"], "r53/d/ALL.csv")
+        self.assertEqual(result["rowsInMaster"], 1)
+        publish.assert_called_once()
+        self.assertIn("<https://link>", publish.call_args[0][1])
+        put_file.assert_any_call("r53/d/ALL.csv", mock.ANY)
+
+    def test_local_output_never_notifies(self):
+        result, publish, put_file = self._main("--output", self.tmp)
+        publish.assert_not_called()
+        put_file.assert_not_called()
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, "d", "ALL.csv")))
+
+    def test_no_notify_flag_skips_sns(self):
+        _, publish, _ = self._main("--output", "s3://reports/r53/", "--no-notify")
+        publish.assert_not_called()
+
+    def test_empty_topic_skips_sns(self):
+        _, publish, _ = self._main("--output", "s3://reports/r53/", topic="")
+        publish.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
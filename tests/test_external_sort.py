@@ -0,0 +1,77 @@
+import os
+import csv
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import external_sort
+from external_sort import external_sort as sort_rows
+
+
+def _key(row):
+    return (row[1], row[0])
+
+
+class ExternalSortTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.out = os.path.join(self.tmp.name, "out.csv")
+
+    def _rows(self, n, seed=1):
+        rnd = random.Random(seed)
+        # quotes, commas and newlines exercise the CSV round trip through spill files
+        values = ["a", "b,c", 'd"e', "f\ng", ""]
+        return [(f"r{rnd.randrange(n // 3 or 1)}", rnd.choice(values)) for _ in range(n)]
+
+    def _read(self):
+        with open(self.out, newline="", encoding="utf-8") as f:
+            return [tuple(r) for r in csv.reader(f)]
+
+    def _spill_files(self):
+        return [f for f in os.listdir(self.tmp.name) if f.startswith("sortrun-")]
+
+    def test_in_memory_sort_dedupes_and_writes_header(self):
+        rows = self._rows(200)
+        count, spills = sort_rows(rows, self.out, key=_key, header=["Name", "Value"], tmp_dir=self.tmp.name)
+        expected = sorted(set(rows), key=lambda r: (_key(r), r))
+        self.assertEqual(spills, 0)
+        self.assertEqual(count, len(expected))
+        self.assertEqual(self._read(), [("Name", "Value")] + expected)
+
+    def test_spilled_multi_pass_merge_matches_in_memory_result(self):
+        rows = self._rows(5000)
+        with mock.patch.object(external_sort, "MAX_FANIN", 3):
+            count, spills = sort_rows(rows, self.out, key=_key, memory_bytes=4096, tmp_dir=self.tmp.name)
+        expected = sorted(set(rows), key=lambda r: (_key(r), r))
+        self.assertGreater(spills, 3)
+        self.assertEqual(count, len(expected))
+        self.assertEqual(self._read(), expected)
+        self.assertEqual(self._spill_files(), [])
+
+    def test_failed_merge_pass_removes_spill_files(self):
+        real_write_run = external_sort._write_run
+        real_merge_runs = external_sort._merge_runs
+        merging = []
+
+        def merge_runs(paths, key):
+            merging.append(paths)
+            return real_merge_runs(paths, key)
+
+        def write_run(rows, tmp_dir):
+            if merging:  # writes during a merge pass hit a full /tmp
+                raise OSError("No space left on device")
+            return real_write_run(rows, tmp_dir)
+
+        with mock.patch.object(external_sort, "MAX_FANIN", 3), \
+                mock.patch.object(external_sort, "_merge_runs", merge_runs), \
+                mock.patch.object(external_sort, "_write_run", write_run):
+            with self.assertRaises(OSError):
+                sort_rows(self._rows(400), self.out, key=_key, memory_bytes=4096, tmp_dir=self.tmp.name)
+        self.assertTrue(merging)
+        self.assertEqual(self._spill_files(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
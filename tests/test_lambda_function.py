@@ -0,0 +1,300 @@
+import os
+import csv
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import botocore
+
+import lambda_function as lf
+
+
+def _zone(zid, private=False, count=3):
+    return {"Id": f"/hostedzone/{zid}", "Name": f"{zid.lower()}.example.com.",
+            "Config": {"PrivateZone": private}, "ResourceRecordSetCount": count}
+
+
+def _client_error(code):
+    return botocore.exceptions.ClientError({"Error": {"Code": code, "Message": code}}, "op")
+
+
+class FakeRoute53:
+    """Just the Route 53 calls enrich_zones makes, with a call log."""
+
+    def __init__(self, log_configs_error=None):
+        self.calls = []
+        self.log_configs_error = log_configs_error
+
+    def list_query_logging_configs(self, **kwargs):
+        self.calls.append("ListQueryLoggingConfigs")
+        if self.log_configs_error:
+            raise self.log_configs_error
+        return {"QueryLoggingConfigs": [{"HostedZoneId": "ZPUB", "CloudWatchLogsLogGroupArn": "arn:lg"}]}
+
+    def get_hosted_zone(self, Id):
+        self.calls.append("GetHostedZone")
+        return {"VPCs": [{"VPCRegion": "us-east-1", "VPCId": "vpc-1"}]}
+
+    def get_dnssec(self, HostedZoneId):
+        self.calls.append("GetDNSSEC")
+        return {"Status": {"ServeSignature": "SIGNING"}}
+
+
+class EnrichZonesTest(unittest.TestCase):
+    ZONES = [_zone("ZPRIV", private=True), _zone("ZPUB")]
+    EXPECTED = {
+        "ZPRIV": {"VPCAssociations": "us-east-1:vpc-1", "DNSSECStatus": "", "QueryLogGroupArn": ""},
+        "ZPUB": {"VPCAssociations": "", "DNSSECStatus": "SIGNING", "QueryLogGroupArn": "arn:lg"},
+    }
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+        for name, value in (("ENRICH_CACHE_PATH", tmp.name), ("ENRICH_CACHE_MAX_AGE_SEC", 3600)):
+            patcher = mock.patch.object(lf, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _run(self, zones=None, r53=None, now=1000):
+        r53 = r53 or FakeRoute53()
+        with mock.patch.object(lf.time, "time", return_value=now):
+            return lf.enrich_zones(r53, "111", zones or self.ZONES), r53
+
+    def _cache_file(self):
+        return os.path.join(self.cache_dir, "zone_metadata_111.json")
+
+    def test_miss_then_hit(self):
+        meta, r53 = self._run()
+        self.assertEqual(meta, self.EXPECTED)
+        self.assertEqual(r53.calls, ["ListQueryLoggingConfigs", "GetHostedZone", "GetDNSSEC"])
+
+        meta, r53 = self._run(now=2000)
+        self.assertEqual(meta, self.EXPECTED)
+        self.assertEqual(r53.calls, ["ListQueryLoggingConfigs"])
+
+    def test_changed_zone_is_refetched(self):
+        self._run()
+        changed = [_zone("ZPRIV", private=True, count=4), _zone("ZPUB")]
+        _, r53 = self._run(zones=changed, now=2000)
+        self.assertEqual(r53.calls, ["ListQueryLoggingConfigs", "GetHostedZone"])
+
+    def test_expired_entries_are_refetched(self):
+        self._run(now=1000)
+        _, r53 = self._run(now=1000 + 3601)
+        self.assertEqual(r53.calls, ["ListQueryLoggingConfigs", "GetHostedZone", "GetDNSSEC"])
+
+    def test_deleted_zones_are_pruned(self):
+        self._run()
+        self._run(zones=[_zone("ZPUB")], now=2000)
+        with open(self._cache_file(), encoding="utf-8") as f:
+            self.assertEqual(list(json.load(f)), ["ZPUB"])
+
+    def test_corrupt_cache_is_ignored_and_rewritten(self):
+        with open(self._cache_file(), "w", encoding="utf-8") as f:
+            f.write('{"ZPRIV": {"Fingerp')
+        meta, r53 = self._run()
+        self.assertEqual(meta, self.EXPECTED)
+        _, r53 = self._run(now=2000)
+        self.assertEqual(r53.calls, ["ListQueryLoggingConfigs"])
+
+    def test_failed_save_keeps_fetched_metadata(self):
+        with mock.patch.object(lf.os, "makedirs", side_effect=OSError("No space left on device")):
+            meta, _ = self._run()
+        self.assertEqual(meta, self.EXPECTED)
+
+    def test_query_logging_failure_only_blanks_log_group(self):
+        r53 = FakeRoute53(log_configs_error=_client_error("AccessDenied"))
+        meta, _ = self._run(r53=r53)
+        self.assertEqual(meta["ZPUB"], {"VPCAssociations": "", "DNSSECStatus": "SIGNING", "QueryLogGroupArn": ""})
+        self.assertEqual(meta["ZPRIV"], self.EXPECTED["ZPRIV"])
+
+
+class PlannerTest(unittest.TestCase):
+    def _plan(self, zones, **settings):
+        with mock.patch.object(lf, "assume_r53_client", return_value=None), \
+                mock.patch.object(lf, "list_all_hosted_zones", return_value=zones), \
+                mock.patch.multiple(lf, **settings):
+            return lf.build_export_plan([{"Id": "111"}])
+
+    def _strategy(self, sizes):
+        # 0.25 s per call, 840 s budget -> 3360 pages per invocation
+        zones = [_zone(f"Z{i}", count=n) for i, n in enumerate(sizes)]
+        return self._plan(zones, ENRICH_ZONES=False, R53_MAX_RPS=5.0, R53_CALL_LATENCY_SEC=0.25,
+                          LAMBDA_BUDGET_SEC=840)
+
+    def test_strategy_thresholds(self):
+        self.assertEqual(self._strategy([300 * 100] * 5)["strategy"], "single")
+        self.assertEqual(self._strategy([300 * 2000] * 2)["strategy"], "parallel-zones")
+        plan = self._strategy([300 * 3000] * 3)
+        self.assertEqual(plan["strategy"], "sharded-zones")
+        self.assertEqual(len(plan["shards"]), 3)
+        plan = self._strategy([300 * 5000])
+        self.assertEqual(plan["strategy"], "fan-out")
+        self.assertEqual(plan["totals"]["invocations"], 2)
+        # one 1.5M-record zone (5000 pages -> 2 chained invocations) + 2000 small zones packed together
+        plan = self._strategy([300 * 5000] + [5] * 2000)
+        self.assertEqual(plan["strategy"], "fan-out")
+        self.assertEqual(len(plan["shards"]), 2)
+        self.assertEqual(plan["totals"]["invocations"], 3)
+
+    def test_failed_accounts_make_plan_incomplete(self):
+        with mock.patch.object(lf, "plan_account", side_effect=RuntimeError("AccessDenied")):
+            plan = lf.build_export_plan([{"Id": "111"}])
+        self.assertEqual(plan["strategy"], "incomplete")
+        self.assertEqual(plan["failed"][0]["Id"], "111")
+
+    def test_force_allowed_only_refuses_organizations_fallback(self):
+        with mock.patch.multiple(lf, ALLOWED_ACCOUNTS=[], FORCE_ALLOWED_ONLY=True):
+            with self.assertRaisesRegex(RuntimeError, "FORCE_ALLOWED_ONLY"):
+                lf.get_target_accounts()
+
+    def test_allowlisted_accounts_are_deduplicated(self):
+        with mock.patch.object(lf, "ALLOWED_ACCOUNTS", ["111", "222", "111"]):
+            self.assertEqual([a["Id"] for a in lf.get_target_accounts()], ["111", "222"])
+
+    def test_enrichment_calls_are_counted(self):
+        zones = [_zone(f"Z{i}", count=10) for i in range(150)]
+        plain = self._plan(zones, ENRICH_ZONES=False)
+        enriched = self._plan(zones, ENRICH_ZONES=True)
+        # 2 ListQueryLoggingConfigs pages + one GetHostedZone/GetDNSSEC per zone
+        self.assertEqual(enriched["totals"]["apiCalls"] - plain["totals"]["apiCalls"], 2 + 150)
+        self.assertGreater(enriched["totals"]["sequentialSec"], plain["totals"]["sequentialSec"])
+        self.assertGreater(enriched["totals"]["parallelSec"], plain["totals"]["parallelSec"])
+
+
+    def test_plan_only_handler_needs_no_bucket_or_topic(self):
+        plan = {"strategy": "parallel-zones", "failed": [], "totals": {"sequentialSec": 1000.0}}
+        with mock.patch.multiple(lf, ORG_ROLE_NAME="Role", REPORT_BUCKET="", SNS_TOPIC_ARN="",
+                                 ALLOWED_ACCOUNTS=["111"]), \
+                mock.patch.object(lf, "build_export_plan", return_value=plan), \
+                self.assertLogs(level="WARNING") as logs:
+            self.assertIs(lf.lambda_handler({"plan": True}, None), plan)
+        self.assertIn("only runs the single strategy", logs.output[0])
+
+    def test_export_still_requires_bucket_and_topic(self):
+        with mock.patch.multiple(lf, ORG_ROLE_NAME="Role", REPORT_BUCKET="", SNS_TOPIC_ARN="",
+                                 ALLOWED_ACCOUNTS=["111"], PLAN_ONLY=False):
+            with self.assertRaisesRegex(RuntimeError, "REPORT_BUCKET, SNS_TOPIC_ARN"):
+                lf.lambda_handler({}, None)
+
+
+def _row(account, name, rtype="A", value="10.0.0.1"):
+    return {"AccountId": account, "ZoneId": "Z1", "ZoneName": "example.com.", "PrivateZone": False,
+            "RecordName": name, "Type": rtype, "TTL": 300, "Values": value}
+
+
+class SortedMasterTest(unittest.TestCase):
+    ROWS = [
+        _row("222", "example.org."),
+        _row("111", "b.example.com."),
+        _row("222", "a.example.com."),
+        _row("111", "A.example.com.", "TXT", "v"),
+        _row("111", "a.example.com."),
+        _row("111", "b.example.com."),   # exact duplicate (account listed twice)
+        _row("111", "a.example.com."),   # exact duplicate
+    ]
+    EXPECTED = [
+        # (RecordName, Type, AccountId): reversed labels, case-insensitive, then Type, then AccountId
+        ("a.example.com.", "A", "111"),
+        ("a.example.com.", "A", "222"),
+        ("A.example.com.", "TXT", "111"),
+        ("b.example.com.", "A", "111"),
+        ("example.org.", "A", "222"),
+    ]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        patcher = mock.patch.multiple(lf, SORT_TMP_DIR=tmp.name, ENRICH_ZONES=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _read(self, path):
+        with open(path, newline="", encoding="utf-8") as f:
+            return [(r["RecordName"], r["Type"], r["AccountId"]) for r in csv.DictReader(f)]
+
+    def test_master_sort_key_orders_by_reversed_labels_type_account(self):
+        keys = [lf.master_sort_key((a, "Z", "z.", "False", name, t, "300", "v"))
+                for name, t, a in [("A.example.com.", "TXT", "1"), ("example.org.", "A", "1")]]
+        self.assertEqual(keys[0], (("com", "example", "a"), "TXT", "1"))
+        self.assertLess(keys[0], keys[1])
+
+    def test_write_sorted_master_sorts_and_dedupes(self):
+        out = os.path.join(self.tmp, "ALL.csv")
+        self.assertEqual(lf.write_sorted_master(iter(self.ROWS), out), len(self.EXPECTED))
+        self.assertEqual(self._read(out), self.EXPECTED)
+
+    def test_handler_sort_master_uploads_sorted_file_and_cleans_up(self):
+        uploaded = {}
+
+        def put_file(key, path):
+            uploaded[key] = self._read(path)
+
+        accounts = {"111": [r for r in self.ROWS if r["AccountId"] == "111"],
+                    "222": [r for r in self.ROWS if r["AccountId"] == "222"]}
+        with mock.patch.multiple(lf, ORG_ROLE_NAME="Role", REPORT_BUCKET="bucket", REPORT_PREFIX="r53/",
+                                 SNS_TOPIC_ARN="arn:topic", ALLOWED_ACCOUNTS=["111", "222"],
+                                 PLAN_ONLY=False, SORT_MASTER=True), \
+                mock.patch.object(lf, "collect_account_rows",
+                                  side_effect=lambda aid, name: (accounts[aid], 1, len(accounts[aid]))), \
+                mock.patch.object(lf, "s3_put"), \
+                mock.patch.object(lf, "s3_put_file", side_effect=put_file), \
+                mock.patch.object(lf, "s3_presign", return_value="https://link"), \
+                mock.patch.object(lf, "publish_sns"):
+            result = lf.lambda_handler({}, None)
+
+        self.assertEqual(result["rowsInMaster"], len(self.EXPECTED))
+        self.assertEqual(uploaded[result["masterKey"]], self.EXPECTED)
+        self.assertEqual([f for f in os.listdir(self.tmp) if f.startswith("ALL-")], [])
+
+
+class ConfigureTest(unittest.TestCase):
+    SETTINGS = ("ALLOWED_ACCOUNTS", "FORCE_ALLOWED_ONLY", "SORT_MASTER", "SORT_MEMORY_MB",
+                "R53_MAX_RPS", "REPORT_PREFIX", "PRESIGN_TTL_SEC")
+
+    def setUp(self):
+        saved = {name: getattr(lf, name) for name in self.SETTINGS}
+        self.addCleanup(lambda: [setattr(lf, k, v) for k, v in saved.items()])
+
+    def test_values_are_coerced_like_env_vars(self):
+        lf.configure({
+            "ALLOWED_ACCOUNT_IDS": " 111, ,222",
+            "FORCE_ALLOWED_ONLY": "True",
+            "SORT_MASTER": True,
+            "SORT_MEMORY_MB": "64",
+            "R53_MAX_RPS": "2.5",
+        })
+        self.assertEqual(lf.ALLOWED_ACCOUNTS, ["111", "222"])
+        self.assertIs(lf.FORCE_ALLOWED_ONLY, True)
+        self.assertIs(lf.SORT_MASTER, True)
+        self.assertEqual(lf.SORT_MEMORY_MB, 64)
+        self.assertEqual(lf.R53_MAX_RPS, 2.5)
+
+        lf.configure({"ALLOWED_ACCOUNT_IDS": [111, "222"]})
+        self.assertEqual(lf.ALLOWED_ACCOUNTS, ["111", "222"])
+
+    def test_unknown_setting_is_rejected(self):
+        with self.assertRaises(ValueError):
+            lf.configure({"NOT_A_SETTING": "x"})
+
+    def test_require_config_names_missing_values(self):
+        with mock.patch.object(lf, "REPORT_BUCKET", ""):
+            with self.assertRaisesRegex(RuntimeError, "REPORT_BUCKET"):
+                lf.require_config("REPORT_BUCKET")
+
+    def test_empty_prefix_stays_at_bucket_root(self):
+        self.assertEqual(lf._normalize_prefix(""), "")
+        self.assertEqual(lf._normalize_prefix("route53/monthly"), "route53/monthly/")
+
+    def test_report_message_uses_presign_ttl(self):
+        lf.configure({"PRESIGN_TTL_SEC": 3600})
+        message = lf.build_report_message("2026-10-19", [("dev", "111", 2, 10)], "https://x")
+        self.assertIn("valid for 1 hour", message)
+        self.assertIn("- dev, 111, 2, 10", message)
+
+
+if __name__ == "__main__":
+    unittest.main()